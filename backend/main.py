@@ -1,21 +1,35 @@
 """
 Vizzy Chat Backend - FastAPI
-Uses OpenRouter API for text generation (free tier via Mistral-7B).
+Uses OpenRouter API for text generation (free tier via openrouter/auto;
+OPENROUTER_CACHED_MODEL optionally pins a prompt-caching model).
 Images via Replicate (optional).
 """
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional, List
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter
+from typing import Optional, List, Tuple, AsyncIterator
 import os
+import sys
 import json
+import orjson
+import asyncio
+import base64
+import functools
+import hashlib
+import re
+import time
 import uuid
+from collections import OrderedDict
 from datetime import datetime
-import urllib.parse
+from io import BytesIO
 from dotenv import load_dotenv
 import logging
+import httpx
+import redis.asyncio as redis
 from huggingface_hub import InferenceClient
+from PIL import features as pil_features
 
 # Try to import replicate, it's optional
 try:
@@ -25,6 +39,24 @@ except ImportError:
     HAS_REPLICATE = False
     replicate = None
 
+# Try to import boto3 (object storage for generated images), it's optional
+try:
+    import boto3
+    HAS_BOTO3 = True
+except ImportError:
+    HAS_BOTO3 = False
+    boto3 = None
+
+# Try to import redisvl (semantic image cache), it's optional
+try:
+    from redisvl.extensions.cache.llm import SemanticCache
+    from redisvl.query.filter import Tag
+    from redisvl.utils.vectorize import HFTextVectorizer
+    HAS_REDISVL = True
+except ImportError:
+    HAS_REDISVL = False
+    SemanticCache = None
+
 # Configure logging FIRST
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -40,10 +72,22 @@ load_dotenv(env_path)
 HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")  # Free tier available
 REPLICATE_API_KEY = os.getenv("REPLICATE_API_KEY")
+REDIS_URL = os.getenv("REDIS_URL")  # Optional, shared session store
+# Optional S3-compatible bucket (AWS S3, Cloudflare R2, Supabase Storage) for generated images
+S3_BUCKET = os.getenv("S3_BUCKET")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+S3_PUBLIC_BASE_URL = os.getenv("S3_PUBLIC_BASE_URL")
+S3_KEY_PREFIX = os.getenv("S3_KEY_PREFIX", "vizzy/")
+
+# replicate's default client reads its token from the environment on first use
+if REPLICATE_API_KEY:
+    os.environ["REPLICATE_API_TOKEN"] = REPLICATE_API_KEY
 
 # Debug: Log loaded API keys
 logging.info(f"REPLICATE_API_KEY set: {bool(REPLICATE_API_KEY)}")
 logging.info(f"OPENROUTER_API_KEY set: {bool(OPENROUTER_API_KEY)}")
+logging.info(f"REDIS_URL set: {bool(REDIS_URL)}")
+logging.info(f"S3_BUCKET set: {bool(S3_BUCKET)}")
 
 # Initialize HF client (deprecated, kept for compatibility)
 hf_client = None
@@ -55,51 +99,242 @@ if HUGGINGFACE_API_KEY:
     except Exception as e:
         logging.warning("Failed to initialize HF client: %s", e)
 
-def generate_text(prompt: str, max_tokens: int = 300, temperature: float = 0.7) -> str:
+# Object storage client: generated images are uploaded and returned as URLs
+# instead of being inlined into the JSON response as base64 data URLs.
+_s3_client = None
+
+if S3_BUCKET and not HAS_BOTO3:
+    logging.warning("S3_BUCKET is set but boto3 is not installed; image uploads disabled")
+elif S3_BUCKET and S3_ENDPOINT_URL and not S3_PUBLIC_BASE_URL:
+    # Objects on R2/Supabase/MinIO aren't served from s3.amazonaws.com, so we
+    # couldn't build a working link for them
+    logging.warning("S3_ENDPOINT_URL is set without S3_PUBLIC_BASE_URL; image uploads disabled")
+elif S3_BUCKET:
+    try:
+        _s3_client = boto3.client("s3", endpoint_url=S3_ENDPOINT_URL or None)
+        logging.info("S3 image storage initialized")
+    except Exception as e:
+        logging.warning("Failed to initialize S3 client: %s", e)
+
+# Redis keeps sessions alive across serverless cold starts and worker processes.
+# Without REDIS_URL, sessions fall back to process memory (local development).
+_redis = None
+_redis_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _new_redis_client():
+    return redis.from_url(REDIS_URL, decode_responses=True, max_connections=20)
+
+
+if REDIS_URL:
+    try:
+        _redis = _new_redis_client()
+        logging.info("Redis session store initialized")
+    except Exception as e:
+        logging.warning("Failed to initialize Redis client: %s", e)
+
+
+def _redis_client():
+    """
+    Return the Redis client for the running loop, or None if Redis isn't configured.
+    Like the OpenRouter client, pooled connections are bound to the loop that
+    opened them, so a different loop gets its own client.
+    """
+    global _redis, _redis_loop
+    if _redis is None:
+        return None
+    loop = asyncio.get_running_loop()
+    if _redis_loop is None:
+        _redis_loop = loop
+    elif _redis_loop is not loop:
+        _redis = _new_redis_client()
+        _redis_loop = loop
+    return _redis
+
+# Semantic image cache: near-duplicate prompts ("red sunset over mountains" vs
+# "red sunset on mountains") reuse previously generated images.
+IMAGE_CACHE_DISTANCE_THRESHOLD = 0.15
+IMAGE_CACHE_TTL_SECONDS = 86400 * 7
+_img_cache = None
+_img_vectorizer = None
+
+if REDIS_URL and HAS_REDISVL:
+    try:
+        _img_vectorizer = HFTextVectorizer("redis/langcache-embed-v1")
+        _img_cache = SemanticCache(
+            name="vizzy-img",
+            redis_url=REDIS_URL,
+            distance_threshold=IMAGE_CACHE_DISTANCE_THRESHOLD,
+            vectorizer=_img_vectorizer,
+            ttl=IMAGE_CACHE_TTL_SECONDS,
+            filterable_fields=[{"name": "num_images", "type": "tag"}],
+        )
+        logging.info("Semantic image cache initialized")
+    except Exception as e:
+        logging.warning("Failed to initialize semantic image cache: %s", e)
+
+# Shared async OpenRouter client: keeps HTTP/2 connections alive between calls
+# so the event loop is never blocked waiting on the network.
+OPENROUTER_CHAT_URL = "https://openrouter.ai/api/v1/chat/completions"
+OPENROUTER_IMAGES_URL = "https://openrouter.ai/api/v1/images/generations"
+OPENROUTER_RETRY_STATUSES = {429, 502, 503, 504}
+OPENROUTER_MAX_RETRIES = 2
+OPENROUTER_MAX_TOKENS = 1000  # Upper bound per completion (batched intents need the headroom)
+OPENROUTER_TEXT_MODEL = "openrouter/auto"  # Auto-selects best available free model
+# Intent/copy calls share a long, fixed system prompt. Auto-routing scatters them
+# across providers, so keys with credit can pin a model that honors prompt caching
+# (e.g. anthropic/claude-3.5-haiku). Opt-in: the default stays on the free router.
+OPENROUTER_CACHED_MODEL = os.getenv("OPENROUTER_CACHED_MODEL") or OPENROUTER_TEXT_MODEL
+
+OPENROUTER_TIMEOUT_SECONDS = 45.0
+
+
+def _new_async_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        transport=httpx.AsyncHTTPTransport(
+            http2=True,
+            retries=OPENROUTER_MAX_RETRIES,  # Reconnect on refused/dropped connections
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+        ),
+        timeout=OPENROUTER_TIMEOUT_SECONDS,
+        headers={
+            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+            "Content-Type": "application/json"
+        },
+    )
+
+
+_async_client = _new_async_client()
+_async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _http_client() -> httpx.AsyncClient:
+    """
+    Return the shared OpenRouter client for the running loop. Pooled connections
+    belong to the loop that opened them, and serverless runtimes may run each
+    invocation on a fresh loop, so a different loop gets its own client.
+    """
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client_loop is None:
+        _async_client_loop = loop
+    elif _async_client_loop is not loop:
+        _async_client = _new_async_client()
+        _async_client_loop = loop
+    return _async_client
+
+
+async def _openrouter_post(url: str, payload: dict) -> httpx.Response:
+    """POST to OpenRouter, retrying timeouts and 429/5xx responses with exponential backoff."""
+    for attempt in range(OPENROUTER_MAX_RETRIES + 1):
+        try:
+            response = await _http_client().post(url, json=payload)
+        except httpx.TimeoutException:
+            if attempt == OPENROUTER_MAX_RETRIES:
+                raise
+            logging.warning(f"OpenRouter timeout, retry {attempt + 1}/{OPENROUTER_MAX_RETRIES}")
+        else:
+            if response.status_code not in OPENROUTER_RETRY_STATUSES or attempt == OPENROUTER_MAX_RETRIES:
+                return response
+            logging.warning(f"OpenRouter returned {response.status_code}, retry {attempt + 1}/{OPENROUTER_MAX_RETRIES}")
+        await asyncio.sleep(0.5 * 2 ** attempt)
+
+
+class LLMCache:
+    """
+    Small in-process LRU cache for LLM completions with a per-entry TTL.
+    Keys are a SHA-256 of the request parameters that affect the output.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl_seconds: int = 1800):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._cache: OrderedDict[str, tuple[str, float]] = OrderedDict()
+
+    @staticmethod
+    def _key(model: str, prompt: str, max_tokens: int, temperature: float, system: Optional[str],
+             json_mode: bool) -> str:
+        raw = json.dumps(
+            {"model": model, "prompt": prompt, "max_tokens": max_tokens, "temperature": temperature,
+             "system": system, "json_mode": json_mode},
+            sort_keys=True,
+        )
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, model: str, prompt: str, max_tokens: int, temperature: float,
+            system: Optional[str] = None, json_mode: bool = False) -> Optional[str]:
+        key = self._key(model, prompt, max_tokens, temperature, system, json_mode)
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.time():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return value
+
+    def set(self, model: str, prompt: str, max_tokens: int, temperature: float, value: str,
+            system: Optional[str] = None, json_mode: bool = False) -> None:
+        key = self._key(model, prompt, max_tokens, temperature, system, json_mode)
+        self._cache[key] = (value, time.time() + self.ttl_seconds)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+
+# Only near-deterministic completions are worth reusing; high-temperature
+# output is meant to vary between calls.
+LLM_CACHE_MAX_TEMPERATURE = 0.3
+_llm_cache = LLMCache(maxsize=1024, ttl_seconds=1800)
+
+
+async def generate_text(prompt: str, max_tokens: int = 300, temperature: float = 0.7,
+                        system: Optional[str] = None, model: str = OPENROUTER_TEXT_MODEL,
+                        json_mode: bool = False) -> str:
     """
     Generate text using OpenRouter API (free tier available).
-    Falls back to simple keyword-based responses if API unavailable.
+    A `system` prompt is sent as a separate, cache_control-marked message so
+    providers that support prompt caching can reuse it across calls.
+    `json_mode` requests a JSON object via response_format; providers that
+    ignore it may still wrap the JSON in prose, so callers should parse defensively.
+    Low-temperature completions are served from the in-memory LLM cache when possible.
     """
     if not OPENROUTER_API_KEY:
         raise RuntimeError("OPENROUTER_API_KEY not set in .env. Get a free key at https://openrouter.ai")
     
+    max_tokens = min(max_tokens, OPENROUTER_MAX_TOKENS)
+    cacheable = temperature <= LLM_CACHE_MAX_TEMPERATURE
+    if cacheable:
+        cached = _llm_cache.get(model, prompt, max_tokens, temperature, system, json_mode)
+        if cached is not None:
+            logging.info("OpenRouter text served from cache")
+            return cached
+    
+    messages = [{"role": "user", "content": prompt}]
+    if system:
+        messages.insert(0, {
+            "role": "system",
+            "content": [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}],
+        })
+    
     try:
-        import requests
-        
-        # Use a fast, free model from OpenRouter
-        api_url = "https://openrouter.ai/api/v1/chat/completions"
-        
-        headers = {
-            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
         payload = {
-            "model": "openrouter/auto",  # Auto-selects best available free model
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": min(max_tokens, 500),
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
             "temperature": temperature,
         }
+        if json_mode:
+            payload["response_format"] = {"type": "json_object"}
         
-        # Increased timeout for slower networks, with retry logic
-        import time
-        max_retries = 2
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(api_url, json=payload, headers=headers, timeout=45)
-                break
-            except requests.Timeout:
-                if attempt < max_retries - 1:
-                    logging.warning(f"OpenRouter timeout, retry {attempt + 1}/{max_retries}")
-                    time.sleep(1)
-                else:
-                    raise
+        response = await _openrouter_post(OPENROUTER_CHAT_URL, payload)
         
         if response.status_code != 200:
             logging.error(f"OpenRouter API error: {response.status_code} - {response.text[:200]}")
             raise RuntimeError(f"OpenRouter API returned status {response.status_code}")
         
-        data = response.json()
+        data = orjson.loads(response.content)
         
         # Extract generated text from OpenRouter response
         if 'choices' in data and len(data['choices']) > 0:
@@ -108,6 +343,8 @@ def generate_text(prompt: str, max_tokens: int = 300, temperature: float = 0.7)
             text = ""
         
         if text:
+            if cacheable:
+                _llm_cache.set(model, prompt, max_tokens, temperature, text, system, json_mode)
             return text
         
         raise ValueError("No generated text in OpenRouter response")
@@ -116,7 +353,48 @@ def generate_text(prompt: str, max_tokens: int = 300, temperature: float = 0.7)
         raise
 
 
-app = FastAPI(title="Vizzy Chat Backend", version="0.1.0")
+async def stream_text(prompt: str, max_tokens: int = 300, temperature: float = 0.7) -> AsyncIterator[str]:
+    """
+    Stream a completion from OpenRouter, yielding content deltas as they arrive.
+    Use generate_text when the full text is needed before continuing.
+    """
+    if not OPENROUTER_API_KEY:
+        raise RuntimeError("OPENROUTER_API_KEY not set in .env. Get a free key at https://openrouter.ai")
+    
+    payload = {
+        "model": OPENROUTER_TEXT_MODEL,
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": min(max_tokens, OPENROUTER_MAX_TOKENS),
+        "temperature": temperature,
+        "stream": True,
+    }
+    
+    async with _http_client().stream("POST", OPENROUTER_CHAT_URL, json=payload) as response:
+        if response.status_code != 200:
+            body = await response.aread()
+            logging.error(f"OpenRouter API error: {response.status_code} - {body[:200]!r}")
+            raise RuntimeError(f"OpenRouter API returned status {response.status_code}")
+        
+        # Server-sent events: "data: {...}" lines, ": comment" keep-alives, "data: [DONE]" at the end
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            try:
+                chunk = orjson.loads(data)
+            except json.JSONDecodeError:
+                continue
+            choices = chunk.get("choices") or []
+            if choices:
+                delta = (choices[0].get("delta") or {}).get("content")
+                if delta:
+                    yield delta
+
+
+# orjson serializes the large image data URLs in /chat responses much faster than stdlib json
+app = FastAPI(title="Vizzy Chat Backend", version="0.1.0", default_response_class=ORJSONResponse)
 
 # Configure CORS origins via ALLOWED_ORIGINS env var (comma-separated).
 # Default is '*' for development. In production set to your Pages origin.
@@ -134,8 +412,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory sessions
+# In-memory sessions (used when Redis is not configured)
 sessions = {}
+SESSION_TTL_SECONDS = 86400
 
 
 class ChatMessage(BaseModel):
@@ -144,11 +423,16 @@ class ChatMessage(BaseModel):
     images: Optional[List[str]] = None
 
 
+# Compiled once: validates a whole stored history in a single pydantic-core call
+_MESSAGES_ADAPTER = TypeAdapter(List[ChatMessage])
+
+
 class ChatRequest(BaseModel):
     session_id: Optional[str] = None
     message: str
     num_images: int = 3
     refinement: Optional[str] = None
+    stream: bool = False  # Chat mode only: reply as server-sent events
 
 
 class ChatResponse(BaseModel):
@@ -170,47 +454,495 @@ class UserTaste(BaseModel):
     themes: List[str] = []
 
 
-def interpret_intent(user_message: str) -> tuple[str, str]:
-    intent_prompt = f"""
-You are an AI art director. Analyze the user's request and:
-1) return a JSON object with keys `intent` and `prompt` only.
+def _session_key(session_id: str) -> str:
+    return f"sess:{session_id}"
+
+
+def _session_messages_key(session_id: str) -> str:
+    return f"sess:{session_id}:msgs"
+
+
+async def session_exists(session_id: str) -> bool:
+    client = _redis_client()
+    if client is None:
+        return session_id in sessions
+    return bool(await client.exists(_session_key(session_id)))
+
+
+async def load_session(session_id: str) -> Optional[dict]:
+    """Return the session dict (created_at, taste, messages) or None if it doesn't exist."""
+    client = _redis_client()
+    if client is None:
+        return sessions.get(session_id)
+    async with client.pipeline(transaction=False) as pipe:
+        pipe.get(_session_key(session_id))
+        pipe.lrange(_session_messages_key(session_id), 0, -1)
+        raw, raw_messages = await pipe.execute()
+    if not raw:
+        return None
+    session = orjson.loads(raw)
+    session["messages"] = [orjson.loads(m) for m in raw_messages]
+    return session
+
+
+async def save_session(session_id: str, session: dict, new_messages: List[dict]) -> None:
+    """
+    Persist session metadata and append new_messages to its history.
+    In Redis, messages live in a separate list so appends don't race with each other.
+    """
+    client = _redis_client()
+    if client is None:
+        sessions[session_id] = session
+        return
+    meta = {"created_at": session["created_at"], "taste": session["taste"]}
+    messages_key = _session_messages_key(session_id)
+    async with client.pipeline(transaction=True) as pipe:
+        pipe.setex(_session_key(session_id), SESSION_TTL_SECONDS, orjson.dumps(meta))
+        if new_messages:
+            pipe.rpush(messages_key, *[orjson.dumps(m) for m in new_messages])
+        pipe.expire(messages_key, SESSION_TTL_SECONDS)
+        await pipe.execute()
+
+
+# Shared system prompt for interpret_intent and generate_copy. It is kept long
+# and byte-for-byte stable on purpose: Anthropic only caches prefixes above a
+# minimum length (2048 tokens for Haiku), and any change invalidates the cache.
+ART_DIRECTOR_SYSTEM_PROMPT = """You are the art director behind Vizzy Chat, a conversational creative assistant that turns short, casual requests into finished visual work: illustrations, posters, product shots, concept art, social media graphics, logos, textures and wallpapers. Each message you receive contains one task (interpreting a request, or writing a tagline) followed by the user's own words. Follow the task instructions exactly and keep to the output format they ask for.
+
+## Intent categories
+Classify every request into exactly one lowercase intent:
+- "creative": open-ended art, illustration, fantasy, surreal or painterly scenes.
+- "marketing": ads, banners, product hero shots, social posts, anything meant to sell or announce.
+- "branding": logos, icons, mascots, brand marks, color palettes and identity work.
+- "photography": realistic photos of people, places, food, products or nature.
+- "design": UI mockups, patterns, textures, wallpapers, infographics and layouts.
+- "storytelling": scenes from a narrative, book covers, comic panels, storyboards.
+- "personal": gifts, greetings, invitations, memorial or celebration images.
+If a request fits several categories, choose the one that best describes how the image will be used. If it is ambiguous, choose "creative".
+
+## Writing image prompts
+The image models behind Vizzy (Stable Diffusion XL, FLUX and similar) respond best to concrete, visual, comma-separated descriptions. When you expand a request into a prompt:
+1. Keep the user's subject first and never replace it. If they asked for a cat, the prompt is about a cat.
+2. Add the setting and the composition: where the subject is, the camera angle (close-up, wide shot, overhead, eye level) and the framing.
+3. Add the lighting: golden hour, soft studio light, neon glow, overcast daylight, candlelight, rim light, volumetric fog.
+4. Add the medium and style: photograph, oil painting, watercolor, flat vector illustration, 3D render, pencil sketch, anime, isometric, pixel art.
+5. Add two or three mood and color words: serene, dramatic, playful, muted pastels, vivid complementary colors, monochrome.
+6. Add quality hints only where they help: highly detailed, sharp focus, 35mm lens, shallow depth of field.
+7. Keep it under 60 words. No full sentences, no instructions to the model, no negative prompts.
+8. Do not add text, captions, watermarks or signatures to the image unless the user explicitly asked for words in the image.
+9. Never include real people's names, trademarked characters or explicit content. Describe a generic equivalent instead.
+10. Respect explicit user choices (style, colors, aspect, mood) even if they conflict with these defaults.
+
+## Writing taglines
+A tagline accompanies the finished artwork in the chat. It should:
+- be a single line of at most 15 words;
+- evoke the feeling of the image rather than describe it literally;
+- use concrete imagery and rhythm; alliteration and contrast are welcome, clichés are not;
+- match the intent: persuasive for marketing, confident for branding, warm for personal, evocative for creative and storytelling;
+- contain no hashtags, emojis, quotation marks, labels or explanations.
+
+## Style vocabulary
+Use these terms when the request implies a look without naming it:
+- Cozy or homely: warm interior light, soft textures, wood and wool, amber and cream tones, shallow depth of field.
+- Epic or heroic: low camera angle, sweeping landscape, dramatic clouds, strong rim light, cinematic wide shot.
+- Dreamy: pastel palette, soft focus, glowing haze, floating particles, gentle gradients.
+- Retro: 1970s film grain, faded warm colors, halftone dots, rounded typography-inspired shapes.
+- Futuristic: clean chrome surfaces, holographic accents, cool blue and white light, sleek geometric forms.
+- Minimal: single subject, generous negative space, flat color, simple geometry, limited palette of two or three colors.
+- Dark or moody: low-key lighting, deep shadows, desaturated palette, a single strong light source, fog.
+- Playful: rounded shapes, saturated primary colors, exaggerated proportions, bouncy composition.
+- Elegant: symmetrical composition, marble and gold accents, soft directional light, refined neutral palette.
+- Natural or organic: earthy greens and browns, natural daylight, visible texture of leaves, wood and stone.
+- Vintage photo: sepia or faded color, soft vignette, grain, slightly overexposed highlights.
+- Hand-made: visible brush strokes, paper texture, imperfect lines, gouache, linocut or crayon.
+
+## Medium guide
+- Photograph: specify lens (24mm wide, 50mm standard, 85mm portrait, macro), lighting and depth of field.
+- Painting: specify the paint (oil, watercolor, acrylic, gouache) and the brushwork (impasto, loose washes, fine detail).
+- Illustration: specify the line and fill (flat vector, ink outline, cel shading, textured brush).
+- 3D: specify the renderer look (clay render, glossy plastic, stylized low poly, photoreal) and the material.
+- Pixel art and isometric: specify the resolution feel (16-bit, 32-bit) or the isometric angle, and keep palettes small.
+- Logos and icons: always flat, centered, plain background, no photographic detail, no text unless requested.
+
+## Handling unusual requests
+- Very short requests ("dog", "sunset"): choose a tasteful, specific interpretation and fill in setting, light and style.
+- Very long requests: keep every concrete detail the user gave and drop only filler words.
+- Requests in another language: write the prompt in English, keep names and quoted words as given.
+- Follow-up refinements ("make it darker", "more blue"): apply the change to the subject and style implied by the request.
+- Text-heavy requests (posters, quotes): describe the layout and leave clear space for text, since image models render words poorly.
+
+## Examples
+Request: "a cat in space"
+Intent: creative
+Prompt: an orange tabby cat floating in a small astronaut suit, drifting past Saturn's rings, wide shot, soft rim light from a distant sun, digital painting, whimsical, deep blues and warm oranges, highly detailed
+Tagline: Nine lives, one endless sky.
+
+Request: "banner for my coffee shop's autumn menu"
+Intent: marketing
+Prompt: steaming pumpkin spice latte on a rustic wooden counter, scattered maple leaves and cinnamon sticks, overhead shot, warm morning window light, commercial food photography, cozy amber and cream palette, shallow depth of field
+Tagline: Autumn, poured slowly.
+
+Request: "logo for a hiking club called Summit"
+Intent: branding
+Prompt: minimalist mountain peak emblem formed by two overlapping triangles, flat vector logo, centered on plain white background, forest green and slate gray, clean geometric lines, balanced negative space
+Tagline: Every trail starts with a single step up.
+
+Request: "my grandma's garden in the morning"
+Intent: personal
+Prompt: cottage garden at sunrise with blooming roses, foxgloves and a weathered wooden bench, dew on the petals, eye level, soft golden light, impressionist oil painting, gentle pinks and sage greens, peaceful
+Tagline: Where every morning smells like home.
+
+Request: "seamless pattern of lemons"
+Intent: design
+Prompt: seamless repeating pattern of whole and sliced lemons with green leaves, flat illustration, evenly spaced on a pale blue background, bright yellow and fresh green, crisp clean shapes
+Tagline: Sunshine, sliced and repeated.
+
+Request: "a knight finding a dragon egg, like a book cover"
+Intent: storytelling
+Prompt: young knight kneeling in a misty cave, holding a glowing dragon egg, low angle, shafts of light through the cave mouth, epic fantasy book cover illustration, dramatic teal and ember orange, highly detailed
+Tagline: Some quests begin the moment something hatches.
+
+Request: "portrait of an old fisherman"
+Intent: photography
+Prompt: weathered elderly fisherman in a yellow raincoat on a wooden pier, close-up portrait, overcast diffused daylight, documentary photography, 85mm lens, muted blues and grays with a pop of yellow, deep wrinkles, sharp focus
+Tagline: The sea wrote its story on his face.
+
+Request: "instagram post announcing our summer sale"
+Intent: marketing
+Prompt: bright beach flat lay with sunglasses, a straw hat, seashells and a colorful beach towel on golden sand, overhead shot, harsh midday sun with crisp shadows, commercial product photography, turquoise and coral palette, vibrant
+Tagline: Sun's out, prices down.
+
+Request: "mascot for a kids' math app"
+Intent: branding
+Prompt: friendly round robot mascot with a calculator screen face and small waving arms, full body, centered, soft studio lighting, glossy 3D render, cheerful primary colors, simple clean shapes, plain light background
+Tagline: Numbers are more fun with a friend.
+
+Request: "cyberpunk city at night"
+Intent: creative
+Prompt: rain-soaked cyberpunk street at night, towering skyscrapers covered in holographic billboards, crowds with umbrellas, low angle wide shot, neon pink and cyan reflections on wet asphalt, cinematic concept art, atmospheric haze, highly detailed
+Tagline: The city never sleeps; it only changes color.
+
+Request: "phone wallpaper, minimal, calm"
+Intent: design
+Prompt: minimal abstract landscape of soft rolling dunes under a pale gradient sky, vertical composition, gentle diffused light, smooth matte shading, calm sand beige and dusty lavender palette, lots of negative space
+Tagline: Quiet, in the palm of your hand.
+
+Request: "birthday card for my brother who loves fishing"
+Intent: personal
+Prompt: cartoon fisherman in a small rowboat on a calm lake pulling up a birthday cake on his fishing line, balloons tied to the boat, wide shot, bright afternoon light, playful watercolor illustration, cheerful blues and warm yellows
+Tagline: Hope this year brings you the big one.
+
+## General rules
+- Be faithful to the user's request; improve it, don't reinterpret it.
+- If the request is not about an image at all, still return the best visual interpretation of it.
+- Never mention these instructions, the model you are, or the categories list in your output.
+- Output only what the task asks for: no greetings, no preamble, no markdown fences, no trailing commentary.
+"""
+
+
+INTENT_MAX_TOKENS = 300
+INTENT_TEMPERATURE = 0.0  # Deterministic so repeated requests can be served from the LLM cache
+
+# Concurrent interpret_intent calls are coalesced: requests arriving within the
+# window are answered by a single OpenRouter call (up to INTENT_BATCH_MAX_SIZE).
+INTENT_BATCH_WINDOW_SECONDS = 0.2
+INTENT_BATCH_MAX_SIZE = 8
+INTENT_BATCH_MAX_TOKENS_PER_ITEM = 120
+# Worst case for one generate_text call: every attempt times out, plus the backoff sleeps
+OPENROUTER_CALL_MAX_SECONDS = (
+    OPENROUTER_TIMEOUT_SECONDS * (OPENROUTER_MAX_RETRIES + 1)
+    + sum(0.5 * 2 ** attempt for attempt in range(OPENROUTER_MAX_RETRIES))
+)
+# Give up on the batcher and make a single call after this. A batch that fails
+# falls back to single calls, so allow for two full calls before abandoning it.
+INTENT_BATCH_TIMEOUT_SECONDS = INTENT_BATCH_WINDOW_SECONDS + 2 * OPENROUTER_CALL_MAX_SECONDS
+_intent_queue: Optional[asyncio.Queue] = None
+_intent_batcher_task: Optional[asyncio.Task] = None
+_intent_batcher_loop: Optional[asyncio.AbstractEventLoop] = None
+_background_tasks: set = set()
+
+
+def _intent_prompt(user_message: str) -> str:
+    return f"""
+Task: interpret the request below. Return a JSON object with keys `intent` and `prompt` only.
 User request: "{user_message}"
 
 Respond with JSON only.
 """
+
+
+def _parse_intent(text: str, user_message: str) -> tuple[str, str]:
     try:
-        if not OPENROUTER_API_KEY:
-            logging.warning("OpenRouter API not available; returning default intent")
-            return "creative", user_message
-        text = generate_text(intent_prompt, max_tokens=300, temperature=0.7)
+        # JSON mode: the whole reply is the object
+        parsed = orjson.loads(text)
+    except orjson.JSONDecodeError:
+        # Providers that ignore response_format may wrap the JSON in prose
         start = text.find("{")
         end = text.rfind("}") + 1
-        if start == -1 or end == -1:
+        if start == -1 or end == 0:
             logging.warning("Couldn't find JSON in intent response; using defaults")
             return "creative", user_message
-        parsed = json.loads(text[start:end])
-        return parsed.get("intent", "creative"), parsed.get("prompt", user_message)
+        parsed = orjson.loads(text[start:end])
+    if not isinstance(parsed, dict):
+        logging.warning("Intent response is not a JSON object; using defaults")
+        return "creative", user_message
+    return parsed.get("intent", "creative"), parsed.get("prompt", user_message)
+
+
+async def _interpret_intent_single(user_message: str) -> tuple[str, str]:
+    try:
+        text = await generate_text(
+            _intent_prompt(user_message), max_tokens=INTENT_MAX_TOKENS, temperature=INTENT_TEMPERATURE,
+            system=ART_DIRECTOR_SYSTEM_PROMPT, model=OPENROUTER_CACHED_MODEL, json_mode=True,
+        )
+        return _parse_intent(text, user_message)
+    except Exception as e:
+        logging.error("interpret_intent failed: %s", e)
+        return "creative", user_message
+
+
+async def _interpret_intent_batch(user_messages: List[str]) -> List[tuple[str, str]]:
+    """
+    Interpret several requests with one OpenRouter call. Raises if the reply can't be matched up.
+    Each request carries an id that must come back with its result, so a dropped
+    or reordered item can't hand one user's prompt to another session.
+    Results are not cached: one user's message could steer the others in the
+    same batch, so only single-call results are reused.
+    """
+    requests = [{"id": f"r{i}", "request": user_message} for i, user_message in enumerate(user_messages)]
+    batch_prompt = f"""
+Task: interpret each of the requests below independently. Return a JSON object with a single key `items`: an array with one object per request, each with keys `id` (copied from the request), `intent` and `prompt` only.
+Requests: {json.dumps(requests)}
+
+Respond with JSON only.
+"""
+    text = await generate_text(
+        batch_prompt, max_tokens=INTENT_BATCH_MAX_TOKENS_PER_ITEM * len(user_messages), temperature=INTENT_TEMPERATURE,
+        system=ART_DIRECTOR_SYSTEM_PROMPT, model=OPENROUTER_CACHED_MODEL, json_mode=True,
+    )
+    try:
+        parsed = orjson.loads(text)
+        parsed = parsed.get("items") if isinstance(parsed, dict) else parsed
+    except orjson.JSONDecodeError:
+        # Providers that ignore response_format may wrap the JSON in prose
+        start = text.find("[")
+        end = text.rfind("]") + 1
+        if start == -1 or end == 0:
+            raise ValueError("No JSON array in batched intent response")
+        parsed = orjson.loads(text[start:end])
+    if not isinstance(parsed, list) or len(parsed) != len(user_messages) or not all(isinstance(p, dict) for p in parsed):
+        raise ValueError(f"Expected {len(user_messages)} intent objects, got {str(parsed)[:100]}")
+    by_id = {str(item.get("id")): item for item in parsed}
+    if sorted(by_id) != sorted(r["id"] for r in requests):
+        raise ValueError(f"Batched intent ids don't match the requests: {sorted(by_id)}")
+
+    return [
+        (by_id[r["id"]].get("intent", "creative"), by_id[r["id"]].get("prompt", r["request"]))
+        for r in requests
+    ]
+
+
+async def _resolve_intent_batch(batch: List[tuple[str, asyncio.Future]]) -> None:
+    user_messages = [user_message for user_message, _ in batch]
+    if len(batch) == 1:
+        results = [await _interpret_intent_single(user_messages[0])]
+    else:
+        logging.info(f"Interpreting {len(batch)} intents in one batch")
+        try:
+            results = await _interpret_intent_batch(user_messages)
+        except Exception as e:
+            logging.warning(f"Batched interpret_intent failed ({e}), falling back to single calls")
+            results = await asyncio.gather(*[_interpret_intent_single(m) for m in user_messages])
+    for (_, future), result in zip(batch, results):
+        if not future.done():
+            future.set_result(result)
+
+
+async def _intent_batcher() -> None:
+    """Collect queued intent requests for up to INTENT_BATCH_WINDOW_SECONDS and dispatch them together."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await _intent_queue.get()]
+        deadline = loop.time() + INTENT_BATCH_WINDOW_SECONDS
+        while len(batch) < INTENT_BATCH_MAX_SIZE:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(_intent_queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        # Resolve in the background so the next window starts collecting immediately
+        task = asyncio.create_task(_resolve_intent_batch(batch))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+
+def _ensure_intent_batcher() -> None:
+    """
+    Start the batcher on the running loop. Serverless runtimes may run each
+    invocation on a fresh loop while the old one sits idle, so a batcher bound
+    to another loop is replaced rather than reused.
+    """
+    global _intent_queue, _intent_batcher_task, _intent_batcher_loop
+    loop = asyncio.get_running_loop()
+    if _intent_batcher_task is None or _intent_batcher_task.done() or _intent_batcher_loop is not loop:
+        _intent_queue = asyncio.Queue()
+        _intent_batcher_task = loop.create_task(_intent_batcher())
+        _intent_batcher_loop = loop
+
+
+async def interpret_intent(user_message: str) -> tuple[str, str]:
+    try:
+        if not OPENROUTER_API_KEY:
+            logging.warning("OpenRouter API not available; returning default intent")
+            return "creative", user_message
+        cached = _llm_cache.get(
+            OPENROUTER_CACHED_MODEL, _intent_prompt(user_message), INTENT_MAX_TOKENS, INTENT_TEMPERATURE,
+            ART_DIRECTOR_SYSTEM_PROMPT, json_mode=True,
+        )
+        if cached is not None:
+            return _parse_intent(cached, user_message)
+        _ensure_intent_batcher()
+        future = asyncio.get_running_loop().create_future()
+        await _intent_queue.put((user_message, future))
+        try:
+            return await asyncio.wait_for(future, timeout=INTENT_BATCH_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logging.warning("Batched interpret_intent timed out, falling back to a single call")
+            return await _interpret_intent_single(user_message)
     except Exception as e:
         logging.error("interpret_intent failed: %s", e)
         return "creative", user_message
 
 
-def generate_copy(prompt: str, intent: str) -> str:
-    copy_prompt = f"Create a short, poetic one-liner (max 15 words) for this artwork.\nRequest: {prompt}\nIntent: {intent}\nRespond with only the tagline."
+async def generate_copy(prompt: str, intent: str) -> str:
+    copy_prompt = f"Task: create a short, poetic one-liner (max 15 words) for this artwork.\nRequest: {prompt}\nIntent: {intent}\nRespond with only the tagline."
     try:
         if not OPENROUTER_API_KEY:
             return "A beautiful creation from your imagination."
-        text = generate_text(copy_prompt, max_tokens=60, temperature=0.8)
+        text = await generate_text(
+            copy_prompt, max_tokens=60, temperature=0.8,
+            system=ART_DIRECTOR_SYSTEM_PROMPT, model=OPENROUTER_CACHED_MODEL,
+        )
         return text.strip() or "A beautiful creation from your imagination."
     except Exception as e:
         logging.error("generate_copy failed: %s", e)
         return "A beautiful creation from your imagination."
 
 
-def generate_images_huggingface(prompt: str, num_images: int = 2) -> tuple[List[str], str]:
+# Circuit breaker for HuggingFace models: model -> epoch until which it is skipped.
+# Payment-gated (402) and discontinued (410) models fail the same way every time,
+# so don't make every request pay a round trip to rediscover that.
+HF_BLACKLIST_KEY = "hf:blacklist"
+HF_BLACKLIST_SECONDS = {"402": 86400, "410": 86400, "403": 3600}
+HF_ERROR_BACKOFF_SECONDS = 300
+HF_ERROR_BACKOFF_MAX_SECONDS = 3600
+_hf_model_blacklist: dict[str, float] = {}
+_hf_model_failures: dict[str, int] = {}
+
+
+async def _sync_hf_blacklist() -> None:
+    """Merge the Redis-persisted model blacklist into the local one."""
+    client = _redis_client()
+    if client is None:
+        return
+    try:
+        stored = await client.hgetall(HF_BLACKLIST_KEY)
+    except Exception as e:
+        logging.warning(f"Failed to load HF model blacklist: {e}")
+        return
+    for model_key, until in stored.items():
+        _hf_model_blacklist[model_key] = max(_hf_model_blacklist.get(model_key, 0), float(until))
+
+
+def _hf_error_status(e: Exception) -> Optional[int]:
+    """
+    HTTP status of a failed HF call. Read from the response when the client
+    exposes one; only errors without a response fall back to matching the
+    blacklisted codes in the message.
+    """
+    status = getattr(getattr(e, "response", None), "status_code", None)
+    if status is not None:
+        return status
+    match = re.search(r"\b(402|403|410)\b", str(e))
+    return int(match.group(1)) if match else None
+
+
+def _is_transient_hf_error(e: Exception) -> bool:
+    """Server-side (5xx) or network failures, as opposed to a request the model rejected."""
+    if isinstance(e, (httpx.TransportError, TimeoutError, ConnectionError)):
+        return True
+    status = _hf_error_status(e)
+    return status is not None and status >= 500
+
+
+async def _blacklist_hf_model(model_key: str, seconds: float) -> None:
+    until = time.time() + seconds
+    _hf_model_blacklist[model_key] = until
+    client = _redis_client()
+    if client is not None:
+        try:
+            await client.hset(HF_BLACKLIST_KEY, model_key, until)
+        except Exception as e:
+            logging.warning(f"Failed to persist HF model blacklist: {e}")
+
+
+def _public_image_url(key: str) -> str:
+    if S3_PUBLIC_BASE_URL:
+        return f"{S3_PUBLIC_BASE_URL.rstrip('/')}/{key}"
+    return f"https://{S3_BUCKET}.s3.amazonaws.com/{key}"
+
+
+def _is_owned_image_url(url: str) -> bool:
+    """True for images we uploaded ourselves; provider-hosted URLs expire."""
+    return _s3_client is not None and str(url).startswith(_public_image_url(""))
+
+
+# Chat UIs don't need lossless images: lossy WebP (or JPEG where Pillow lacks
+# WebP support) is several times smaller than PNG for the same picture.
+IMAGE_QUALITY = 85
+HAS_WEBP = pil_features.check("webp")
+
+
+def _encode_image(image) -> tuple[BytesIO, str, str]:
+    """Encode a PIL image for delivery. Returns (buffer, mime_type, file_extension)."""
+    buffered = BytesIO()
+    if HAS_WEBP:
+        image.save(buffered, format="WEBP", quality=IMAGE_QUALITY, method=6)
+        return buffered, "image/webp", "webp"
+    # JPEG has no alpha channel
+    image.convert("RGB").save(buffered, format="JPEG", quality=IMAGE_QUALITY, optimize=True)
+    return buffered, "image/jpeg", "jpg"
+
+
+def _image_to_url(image) -> str:
+    """
+    Encode a PIL image and return a URL for it: an object storage URL when a
+    bucket is configured, otherwise (or if the upload fails) a base64 data URL.
+    Blocking; call via asyncio.to_thread.
+    """
+    buffered, mime_type, extension = _encode_image(image)
+    if _s3_client is not None:
+        key = f"{S3_KEY_PREFIX}{uuid.uuid4().hex}.{extension}"
+        try:
+            buffered.seek(0)
+            _s3_client.upload_fileobj(
+                buffered, S3_BUCKET, key,
+                ExtraArgs={"ContentType": mime_type, "CacheControl": "public, max-age=31536000, immutable"},
+            )
+            return _public_image_url(key)
+        except Exception as e:
+            logging.warning(f"Image upload failed ({str(e)[:100]}), returning data URL")
+    img_str = base64.b64encode(buffered.getvalue()).decode()
+    return f"data:{mime_type};base64,{img_str}"
+
+
+async def generate_images_huggingface(prompt: str, num_images: int = 2) -> tuple[List[str], str]:
     """
     Generate images using HuggingFace's free inference API.
-    Tries multiple free-tier models with fallback strategy.
+    Tries multiple free-tier models with fallback strategy; all images for a
+    model are requested concurrently. Models that recently failed are skipped.
     Returns tuple of (image_urls, model_used).
     """
     if not HUGGINGFACE_API_KEY or not hf_client:
@@ -218,9 +950,6 @@ def generate_images_huggingface(prompt: str, num_images: int = 2) -> tuple[List[
         return [], "Placeholder (no HuggingFace key)"
     
     try:
-        import base64
-        from io import BytesIO
-        
         # Models to try in order of preference (free/stable first)
         models_to_try = [
             "stabilityai/stable-diffusion-xl-base-1.0",
@@ -229,51 +958,73 @@ def generate_images_huggingface(prompt: str, num_images: int = 2) -> tuple[List[
             None  # Default model as last resort
         ]
         
+        await _sync_hf_blacklist()
+        
         for model_name in models_to_try:
+            model_key = model_name or "default"
+            if _hf_model_blacklist.get(model_key, 0) > time.time():
+                logging.info(f"Skipping {model_key}: recently failed")
+                continue
+            
             try:
                 if model_name:
                     logging.info(f"Attempting {model_name.split('/')[-1]}...")
                 else:
                     logging.info(f"Attempting default HuggingFace model...")
                 
-                images = []
-                for i in range(num_images):
-                    try:
-                        if model_name:
-                            image = hf_client.text_to_image(prompt, model=model_name)
-                        else:
-                            image = hf_client.text_to_image(prompt)
-                        
-                        if image:
-                            # Convert PIL image to base64 data URL
-                            buffered = BytesIO()
-                            image.save(buffered, format="PNG")
-                            img_str = base64.b64encode(buffered.getvalue()).decode()
-                            data_url = f"data:image/png;base64,{img_str}"
-                            images.append(data_url)
-                            logging.info(f"Generated image {i+1}/{num_images}")
-                    except Exception as e_inner:
-                        logging.warning(f"Image {i+1} failed: {str(e_inner)[:100]}, continuing...")
-                        continue
+                # InferenceClient is synchronous; run each request in a thread and fan out
+                if model_name:
+                    calls = [asyncio.to_thread(hf_client.text_to_image, prompt, model=model_name) for _ in range(num_images)]
+                else:
+                    calls = [asyncio.to_thread(hf_client.text_to_image, prompt) for _ in range(num_images)]
+                results = await asyncio.gather(*calls, return_exceptions=True)
+                
+                generated = []
+                errors = []
+                for i, image in enumerate(results):
+                    if isinstance(image, Exception):
+                        logging.warning(f"Image {i+1} failed: {str(image)[:100]}, continuing...")
+                        errors.append(image)
+                    elif image:
+                        generated.append(image)
+                        logging.info(f"Generated image {i+1}/{num_images}")
+                
+                # Encode (and upload, if storage is configured) all images concurrently
+                images = list(await asyncio.gather(*[asyncio.to_thread(_image_to_url, image) for image in generated]))
                 
                 if images:
                     model_label = model_name.split('/')[-1] if model_name else "HuggingFace (default)"
                     logging.info(f"Successfully generated {len(images)} images via {model_label}")
+                    _hf_model_failures.pop(model_key, None)
                     return images[:num_images], f"HuggingFace ({model_label})"
-                else:
-                    logging.warning(f"No images generated with {model_name or 'default'}")
-                    continue
+                if errors:
+                    # Every request failed; surface the error so it's classified below
+                    raise errors[0]
+                logging.warning(f"No images generated with {model_name or 'default'}")
+                continue
                     
             except Exception as e:
-                err_str = str(e)
-                if "402" in err_str:
-                    logging.warning(f"{model_name or 'default'}: requires payment, trying next...")
-                elif "403" in err_str:
-                    logging.warning(f"{model_name or 'default'}: forbidden access, trying next...")
-                elif "410" in err_str:
-                    logging.warning(f"{model_name or 'default'}: discontinued, trying next...")
+                status = _hf_error_status(e)
+                if status == 402:
+                    logging.warning(f"{model_key}: requires payment, trying next...")
+                    await _blacklist_hf_model(model_key, HF_BLACKLIST_SECONDS["402"])
+                elif status == 403:
+                    logging.warning(f"{model_key}: forbidden access, trying next...")
+                    await _blacklist_hf_model(model_key, HF_BLACKLIST_SECONDS["403"])
+                elif status == 410:
+                    logging.warning(f"{model_key}: discontinued, trying next...")
+                    await _blacklist_hf_model(model_key, HF_BLACKLIST_SECONDS["410"])
+                elif _is_transient_hf_error(e):
+                    logging.warning(f"{model_key} failed: {str(e)[:80]}, trying next...")
+                    # Exponential backoff for server/network errors: 5 min, 10 min, 20 min, ... capped at 1 h
+                    failures = _hf_model_failures.get(model_key, 0) + 1
+                    _hf_model_failures[model_key] = failures
+                    backoff = min(HF_ERROR_BACKOFF_SECONDS * 2 ** (failures - 1), HF_ERROR_BACKOFF_MAX_SECONDS)
+                    await _blacklist_hf_model(model_key, backoff)
                 else:
-                    logging.warning(f"{model_name or 'default'} failed: {str(e)[:80]}, trying next...")
+                    # Other 4xx errors (validation, content filter) are usually caused by this
+                    # prompt, so they shouldn't take the model down for everyone
+                    logging.warning(f"{model_key} rejected request: {str(e)[:80]}, trying next...")
                 continue
         
         # All models failed
@@ -285,7 +1036,7 @@ def generate_images_huggingface(prompt: str, num_images: int = 2) -> tuple[List[
         return [], "Placeholder (HuggingFace error)"
 
 
-def generate_images_openrouter(prompt: str, num_images: int = 2) -> tuple[List[str], str]:
+async def generate_images_openrouter(prompt: str, num_images: int = 2) -> tuple[List[str], str]:
     """
     Generate images using OpenRouter's Flux AI image generation API.
     Flux is free on OpenRouter and produces high-quality images.
@@ -297,19 +1048,8 @@ def generate_images_openrouter(prompt: str, num_images: int = 2) -> tuple[List[s
         return _generate_placeholder_images(num_images, seed_prompt=prompt), "Placeholder (no API key)"
     
     try:
-        import requests
-        import time
-        
-        # OpenRouter image generation endpoint - Flux AI is free
-        api_url = "https://openrouter.ai/api/v1/images/generations"
-        
         logging.info(f"Generating {num_images} images via OpenRouter Flux for: {prompt[:50]}...")
         
-        headers = {
-            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
         payload = {
             "model": "black-forest-labs/flux-pro",  # Flux AI - free, high quality
             "prompt": prompt,
@@ -318,25 +1058,16 @@ def generate_images_openrouter(prompt: str, num_images: int = 2) -> tuple[List[s
             "response_format": "url"  # Return URLs instead of base64
         }
         
-        # Make request with timeout and retry on timeout
-        max_retries = 2
-        response = None
-        
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(api_url, json=payload, headers=headers, timeout=45)
-                break
-            except requests.Timeout:
-                if attempt < max_retries - 1:
-                    logging.warning(f"Timeout occurred, retrying ({attempt + 1}/{max_retries})...")
-                    time.sleep(2)  # Wait before retrying
-                else:
-                    logging.error("Max retries reached, using placeholders")
-                    return _generate_placeholder_images(num_images, seed_prompt=prompt), "Placeholder (timeout)"
+        # Make request with timeout; transient failures are retried by _openrouter_post
+        try:
+            response = await _openrouter_post(OPENROUTER_IMAGES_URL, payload)
+        except httpx.HTTPError as e:
+            logging.error(f"OpenRouter request failed after retries ({e}), using placeholders")
+            return _generate_placeholder_images(num_images, seed_prompt=prompt), "Placeholder (timeout)"
 
-        if response and response.status_code == 200:
+        if response.status_code == 200:
             try:
-                data = response.json()
+                data = orjson.loads(response.content)
                 image_urls = data.get("images", [])
                 if len(image_urls) < num_images:
                     logging.warning("Fewer images returned than requested, using placeholders")
@@ -346,27 +1077,25 @@ def generate_images_openrouter(prompt: str, num_images: int = 2) -> tuple[List[s
                 logging.error("Invalid JSON response, using placeholders")
                 return _generate_placeholder_images(num_images, seed_prompt=prompt), "Placeholder (invalid JSON)"
         else:
-            logging.error(f"OpenRouter API error: {response.status_code if response else 'No response'}")
+            logging.error(f"OpenRouter API error: {response.status_code}")
             return _generate_placeholder_images(num_images, seed_prompt=prompt), "Placeholder (API error)"
     except Exception as e:
         logging.error("OpenRouter image_generation failed: %s", e)
         raise
 
 
-def generate_images_replicate(prompt: str, num_images: int = 3) -> tuple[List[str], str]:
+async def generate_images_replicate(prompt: str, num_images: int = 3) -> tuple[List[str], str]:
     """Generate images using Replicate Flux Schnell model if available, else return placeholders."""
     if not REPLICATE_API_KEY or not HAS_REPLICATE:
         return _generate_placeholder_images(num_images, seed_prompt=prompt), "Placeholder (no Replicate key or module)"
 
     try:
-        # Set Replicate API token
-        import os as os_module
-        os_module.environ["REPLICATE_API_TOKEN"] = REPLICATE_API_KEY
-        
         logging.info(f"Calling Replicate Flux Schnell with token (first 10): {REPLICATE_API_KEY[:10]}...")
         
         # Use Flux Schnell - a free, fast, open-source image generation model
-        output = replicate.run(
+        # replicate.run blocks until the prediction finishes; run it off the event loop
+        output = await asyncio.to_thread(
+            replicate.run,
             "black-forest-labs/flux-schnell",
             input={
                 "prompt": prompt,
@@ -395,91 +1124,184 @@ def generate_images_replicate(prompt: str, num_images: int = 3) -> tuple[List[st
         return _generate_placeholder_images(num_images, seed_prompt=prompt), "Placeholder (Replicate error)"
 
 
-def generate_images(prompt: str, num_images: int = 2) -> tuple[List[str], str]:
+async def generate_images(prompt: str, num_images: int = 2) -> tuple[List[str], str]:
     """
-    Intelligently generate images with fallback chain:
-    1. HuggingFace (free, no credits needed)
-    2. Replicate (if API key available)
-    3. OpenRouter (if API key available)
-    4. SVG placeholders (final fallback)
+    Return images for the prompt, serving semantically similar earlier prompts
+    from the image cache and otherwise generating them via the provider chain.
     Returns tuple of (image_urls, model_name).
     """
-    logging.info(f"generate_images() called: HF={'yes' if hf_client else 'no'}, REP={HAS_REPLICATE}, OR={'yes' if OPENROUTER_API_KEY else 'no'}")
-    
-    # Priority 1: Try HuggingFace FREE inference (no credits needed)
-    logging.info("Priority 1: Attempting HuggingFace free inference...")
-    try:
-        images, model = generate_images_huggingface(prompt, num_images)
-        if images and "Placeholder" not in model:
-            logging.info(f"✓ Generated images via {model}")
-            return images, model
-        else:
-            logging.info(f"HuggingFace returned: {model}")
-    except Exception as e:
-        logging.warning(f"HuggingFace failed ({e}), trying Replicate...")
-    
-    # Priority 2: Try Replicate if API key available (for when user adds credits)
-    if REPLICATE_API_KEY and HAS_REPLICATE:
-        logging.info("Priority 2: Attempting Replicate...")
+    # Embed the prompt once and reuse the vector for both the lookup and the store
+    vector = None
+    if _img_cache is not None:
         try:
-            images, model = generate_images_replicate(prompt, num_images)
-            if images and not "Placeholder" in model:
-                logging.info(f"✓ Generated images via {model}")
-                return images, model
-            else:
-                logging.info(f"Replicate returned: {model}")
+            vector = await asyncio.to_thread(_img_vectorizer.embed, prompt)
+            hits = await asyncio.to_thread(
+                _img_cache.check,
+                prompt=prompt,
+                vector=vector,
+                return_fields=["response", "metadata"],
+                filter_expression=Tag("num_images") == str(num_images),
+            )
+            if hits:
+                model = (hits[0].get("metadata") or {}).get("model", "Semantic cache")
+                logging.info(f"✓ Serving cached images from {model}")
+                return orjson.loads(hits[0]["response"]), model
         except Exception as e:
-            logging.warning(f"Replicate failed ({e}), trying OpenRouter...")
-    
-    # Priority 3: Try OpenRouter (if endpoint available)
-    if OPENROUTER_API_KEY:
-        logging.info("Priority 3: Attempting OpenRouter...")
+            logging.warning(f"Semantic image cache lookup failed: {e}")
+
+    images, model = await _generate_images_from_providers(prompt, num_images)
+
+    # Only cache images stored in our own bucket: Replicate and OpenRouter
+    # URLs expire long before the cache TTL, and inline base64 data URLs
+    # (HuggingFace without object storage) are hundreds of KB each
+    if (vector is not None and images
+            and all(_is_owned_image_url(image) for image in images)):
         try:
-            images, model = generate_images_openrouter(prompt, num_images)
-            if images and not "Placeholder" in model:
-                logging.info(f"✓ Generated images via {model}")
-                return images, model
+            await asyncio.to_thread(
+                _img_cache.store,
+                prompt=prompt,
+                response=json.dumps(images),
+                vector=vector,
+                metadata={"model": model},
+                filters={"num_images": str(num_images)},
+            )
         except Exception as e:
-            logging.warning(f"OpenRouter failed ({e}), using SVG fallback...")
+            logging.warning(f"Semantic image cache store failed: {e}")
+
+    return images, model
+
+
+# Image providers by priority (higher runs first). Lower-priority providers are
+# hedged: each one launches only if nothing has succeeded after another
+# IMAGE_PROVIDER_HEDGE_DELAY_SECONDS. Any provider still running past the delay
+# gets a hedge (and cancelling it doesn't stop a replicate.run already in its
+# thread), so the default sits above HuggingFace's typical 5-15 s latency.
+IMAGE_PROVIDER_PRIORITY = {"HuggingFace": 3, "Replicate": 2, "OpenRouter": 1}
+IMAGE_PROVIDER_HEDGE_DELAY_SECONDS = float(os.getenv("IMAGE_PROVIDER_HEDGE_DELAY_SECONDS", 20))
+
+
+async def _generate_images_from_providers(prompt: str, num_images: int) -> tuple[List[str], str]:
+    """
+    Race the configured image providers and return the first real result:
+    - HuggingFace (free, no credits needed) starts immediately
+    - Replicate (if API key available) joins after the hedge delay
+    - OpenRouter (if API key available) joins after another hedge delay
+    A provider that fails early hands over to the next one straight away.
+    Remaining providers are cancelled once one succeeds; SVG placeholders are
+    the final fallback. Returns tuple of (image_urls, model_name).
+    """
+    logging.info(f"generate_images() called: HF={'yes' if hf_client else 'no'}, REP={HAS_REPLICATE}, OR={'yes' if OPENROUTER_API_KEY else 'no'}")
+    
+    providers = {"HuggingFace": generate_images_huggingface}
+    if REPLICATE_API_KEY and HAS_REPLICATE:
+        providers["Replicate"] = generate_images_replicate
+    if OPENROUTER_API_KEY:
+        providers["OpenRouter"] = generate_images_openrouter
+    queued = sorted(providers.items(), key=lambda item: IMAGE_PROVIDER_PRIORITY[item[0]], reverse=True)
     
-    # Priority 4: Fallback to colored SVG placeholders
+    tasks = {}
+    
+    def launch_next() -> asyncio.Task:
+        name, generate = queued.pop(0)
+        logging.info(f"Attempting {name} (priority {IMAGE_PROVIDER_PRIORITY[name]})...")
+        task = asyncio.create_task(generate(prompt, num_images))
+        tasks[task] = name
+        return task
+    
+    pending = {launch_next()}
+    try:
+        while pending or queued:
+            if not pending:
+                # Everything launched so far has failed; don't wait out the hedge delay
+                pending.add(launch_next())
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=IMAGE_PROVIDER_HEDGE_DELAY_SECONDS if queued else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                # Running providers are slow; hedge with the next one alongside them
+                pending.add(launch_next())
+                continue
+            for task in sorted(done, key=lambda t: IMAGE_PROVIDER_PRIORITY[tasks[t]], reverse=True):
+                name = tasks[task]
+                try:
+                    images, model = task.result()
+                except Exception as e:
+                    logging.warning(f"{name} failed ({e})")
+                    continue
+                if images and "Placeholder" not in model:
+                    logging.info(f"✓ Generated images via {model}")
+                    return images, model
+                logging.info(f"{name} returned: {model}")
+    finally:
+        # A slow provider must not hold up the response once another has won
+        for task in pending:
+            task.cancel()
+    
+    # Fallback to colored SVG placeholders
     logging.info("Using SVG placeholder images (all providers exhausted)")
     return _generate_placeholder_images(num_images, seed_prompt=prompt), "Placeholder (SVG - colored by prompt)"
 
 
-def generate_chat_reply(user_message: str) -> str:
-    system_msg = (
-        "You are Vizzy Chat — a helpful, friendly creative assistant. "
-        "Respond conversationally and concisely. If unsure about user intent, ask a clarifying question."
-    )
+CHAT_SYSTEM_MSG = (
+    "You are Vizzy Chat — a helpful, friendly creative assistant. "
+    "Respond conversationally and concisely. If unsure about user intent, ask a clarifying question."
+)
+NO_API_CHAT_REPLY = "I can help with image ideas and copy — what would you like to create?"
+
+
+def _fallback_chat_reply(user_message: str) -> str:
+    text = user_message.strip().lower()
+    if any(k in text for k in ("summarize", "explain", "what is", "what's")):
+        return (
+            "Vizzy Chat is a conversational AI creative assistant that helps you generate images, "
+            "write content, and explore creative ideas through visual brainstorming. "
+            "Would you like me to help you create something specific?"
+        )
+    elif any(w in text for w in ("how", "why", "when", "where", "who", "what")) or "?" in text:
+        return (
+            f"That's an interesting question about '{user_message}'. "
+            "I'd love to help! Vizzy Chat can generate images, write creative copy, or discuss ideas. "
+            "What would you like to explore today?"
+        )
+    else:
+        return (
+            f"Thanks for sharing '{user_message}' with me. "
+            "I can help you create visuals, write content, or brainstorm ideas. "
+            "What sounds interesting to you?"
+        )
+
+
+async def generate_chat_reply(user_message: str) -> str:
     try:
         if not OPENROUTER_API_KEY:
             logging.warning("OpenRouter API not configured; returning local fallback")
-            return "I can help with image ideas and copy — what would you like to create?"
-        prompt = system_msg + "\nUser: " + user_message
-        text = generate_text(prompt, max_tokens=300, temperature=0.7)
+            return NO_API_CHAT_REPLY
+        prompt = CHAT_SYSTEM_MSG + "\nUser: " + user_message
+        text = await generate_text(prompt, max_tokens=300, temperature=0.7)
         return text.strip()
     except Exception as e:
         logging.error("generate_chat_reply failed: %s", e)
-        text = user_message.strip().lower()
-        if any(k in text for k in ("summarize", "explain", "what is", "what's")):
-            return (
-                "Vizzy Chat is a conversational AI creative assistant that helps you generate images, "
-                "write content, and explore creative ideas through visual brainstorming. "
-                "Would you like me to help you create something specific?"
-            )
-        elif any(w in text for w in ("how", "why", "when", "where", "who", "what")) or "?" in text:
-            return (
-                f"That's an interesting question about '{user_message}'. "
-                "I'd love to help! Vizzy Chat can generate images, write creative copy, or discuss ideas. "
-                "What would you like to explore today?"
-            )
-        else:
-            return (
-                f"Thanks for sharing '{user_message}' with me. "
-                "I can help you create visuals, write content, or brainstorm ideas. "
-                "What sounds interesting to you?"
-            )
+        return _fallback_chat_reply(user_message)
+
+
+async def stream_chat_reply(user_message: str) -> AsyncIterator[str]:
+    """Like generate_chat_reply, but yields the reply incrementally as OpenRouter produces it."""
+    if not OPENROUTER_API_KEY:
+        logging.warning("OpenRouter API not configured; returning local fallback")
+        yield NO_API_CHAT_REPLY
+        return
+    streamed = False
+    try:
+        async for delta in stream_text(CHAT_SYSTEM_MSG + "\nUser: " + user_message, max_tokens=300, temperature=0.7):
+            streamed = True
+            yield delta
+    except Exception as e:
+        logging.error("stream_chat_reply failed: %s", e)
+        # Once part of the reply has been sent we can't swap in a fallback
+        if not streamed:
+            yield _fallback_chat_reply(user_message)
 
 
 @app.on_event("startup")
@@ -489,6 +1311,16 @@ async def startup():
     print(f"Replicate key available: {bool(REPLICATE_API_KEY)}")
 
 
+@app.on_event("shutdown")
+async def shutdown():
+    if _intent_batcher_task is not None and _intent_batcher_loop is asyncio.get_running_loop():
+        _intent_batcher_task.cancel()
+    if _async_client_loop in (None, asyncio.get_running_loop()):
+        await _async_client.aclose()
+    if _redis is not None and _redis_loop in (None, asyncio.get_running_loop()):
+        await _redis.aclose()
+
+
 @app.get("/")
 async def root():
     return {
@@ -501,83 +1333,121 @@ async def root():
     }
 
 
+async def _record_exchange(session_id: str, session: dict, user_message: str, copy_text: str,
+                           images: List[str], intent_category: str, image_model_used: str,
+                           llm_model: str) -> ChatResponse:
+    """Append the user/assistant turn to the session, persist it and build the response."""
+    user_msg = ChatMessage(role="user", content=user_message)
+    assistant_msg = ChatMessage(role="assistant", content=copy_text, images=images)
+    new_messages = [user_msg.model_dump(), assistant_msg.model_dump()]
+    session["messages"].extend(new_messages)
+
+    if intent_category and intent_category not in session["taste"]["themes"]:
+        session["taste"]["themes"].append(intent_category)
+
+    await save_session(session_id, session, new_messages)
+
+    return ChatResponse(
+        session_id=session_id,
+        message=copy_text,
+        images=images,
+        copy=copy_text,
+        intent_category=intent_category,
+        conversation_history=_MESSAGES_ADAPTER.validate_python(session["messages"]),
+        llm_model=llm_model,
+        image_model=image_model_used
+    )
+
+
+async def _stream_chat_events(session_id: str, session: dict, user_message: str) -> AsyncIterator[str]:
+    """
+    Server-sent events for chat mode: one `data: {"delta": ...}` event per chunk,
+    then an `event: done` carrying the full ChatResponse once the session is saved.
+    """
+    chunks = []
+    async for delta in stream_chat_reply(user_message):
+        chunks.append(delta)
+        yield f"data: {orjson.dumps({'delta': delta}).decode()}\n\n"
+    reply = "".join(chunks).strip()
+    response = await _record_exchange(
+        session_id, session, user_message, reply, [], "chat", "none", OPENROUTER_TEXT_MODEL
+    )
+    yield f"event: done\ndata: {response.model_dump_json()}\n\n"
+
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     session_id = request.session_id or str(uuid.uuid4())
-    if session_id not in sessions:
-        sessions[session_id] = {"created_at": datetime.now().isoformat(), "messages": [], "taste": UserTaste()}
-    session = sessions[session_id]
+    session = await load_session(session_id)
+    if session is None:
+        session = {"created_at": datetime.now().isoformat(), "messages": [], "taste": UserTaste().model_dump()}
+
+    if request.num_images == 0 and request.stream:
+        return StreamingResponse(
+            _stream_chat_events(session_id, session, request.message),
+            media_type="text/event-stream",
+        )
 
     image_model_used = "none"
     
     if request.num_images == 0:
         # Chat mode: only text, no images
-        reply = generate_chat_reply(request.message)
+        reply = await generate_chat_reply(request.message)
         copy_text = reply
         images = []
         intent_category = "chat"
     else:
         # Image mode: generate images + copy
-        intent_category, enhanced_prompt = interpret_intent(request.message)
+        intent_category, enhanced_prompt = await interpret_intent(request.message)
         
-        # Generate images (tries Replicate first, then OpenRouter, then falls back to colored SVGs)
-        images, image_model_used = generate_images(enhanced_prompt, min(request.num_images, 2))
-        
-        copy_text = generate_copy(request.message, intent_category)
-
-    user_msg = ChatMessage(role="user", content=request.message)
-    assistant_msg = ChatMessage(role="assistant", content=copy_text, images=images)
-    session["messages"].append(user_msg.model_dump())
-    session["messages"].append(assistant_msg.model_dump())
+        # Images and copy only depend on the interpreted intent, so run them concurrently.
+        # Images try HuggingFace, then Replicate, then OpenRouter, then fall back to colored SVGs.
+        images_task = asyncio.create_task(generate_images(enhanced_prompt, min(request.num_images, 2)))
+        copy_task = asyncio.create_task(generate_copy(request.message, intent_category))
+        (images, image_model_used), copy_text = await asyncio.gather(images_task, copy_task)
 
-    if intent_category and intent_category not in session["taste"].themes:
-        session["taste"].themes.append(intent_category)
-
-    return ChatResponse(
-        session_id=session_id,
-        message=copy_text,
-        images=images,
-        copy=copy_text,
-        intent_category=intent_category,
-        conversation_history=[ChatMessage(**m) for m in session["messages"]],
-        llm_model="openrouter/auto",
-        image_model=image_model_used
+    return await _record_exchange(
+        session_id, session, request.message, copy_text, images, intent_category, image_model_used,
+        OPENROUTER_TEXT_MODEL if request.num_images == 0 else OPENROUTER_CACHED_MODEL
     )
 
 
 @app.post("/refine", response_model=ChatResponse)
 async def refine(request: ChatRequest):
-    if not request.session_id or request.session_id not in sessions:
+    if not request.session_id or not await session_exists(request.session_id):
         raise HTTPException(status_code=404, detail="Session not found")
     refined_message = f"{request.message}. {request.refinement or ''}"
-    refined_request = ChatRequest(session_id=request.session_id, message=refined_message, num_images=request.num_images)
+    refined_request = ChatRequest(
+        session_id=request.session_id, message=refined_message, num_images=request.num_images, stream=request.stream
+    )
     return await chat(refined_request)
 
 
 @app.get("/session/{session_id}")
 async def get_session(session_id: str):
-    if session_id not in sessions:
+    session = await load_session(session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
-    return {"session_id": session_id, **sessions[session_id]}
+    return {"session_id": session_id, **session, "messages": _MESSAGES_ADAPTER.validate_python(session["messages"])}
 
 
-def _generate_placeholder_images(num_images: int, seed_prompt: str) -> List[str]:
+@functools.lru_cache(maxsize=512)
+def _generate_placeholder_images(num_images: int, seed_prompt: str) -> Tuple[str, ...]:
     """
     Generate placeholder images with unique colors based on the seed prompt.
-    Each image is represented as an SVG data URL.
+    Each image is represented as an SVG data URL. Results are cached, so the
+    return value is an immutable tuple.
     """
-    import hashlib
-    import random
-
     # Generate a deterministic hash from the seed prompt
     hash_val = hashlib.md5(seed_prompt.encode()).hexdigest()
-    random.seed(hash_val)
 
     demo_images = []
     for i in range(num_images):
+        # Derive colors from successive byte pairs of the hash (wraps for large counts)
+        offset = (i * 4) % (len(hash_val) - 2)
         hue = (int(hash_val, 16) + i * 120) % 360  # Spread hues evenly
-        saturation = random.randint(60, 100)  # Saturation between 60-100%
-        lightness = random.randint(50, 80)  # Lightness between 50-80%
+        saturation = 60 + int(hash_val[offset:offset + 2], 16) % 41  # Saturation between 60-100%
+        lightness = 50 + int(hash_val[offset + 2:offset + 4], 16) % 31  # Lightness between 50-80%
         color = f"hsl({hue}, {saturation}%, {lightness}%)"
 
         # Create SVG with gradient background
@@ -588,12 +1458,28 @@ def _generate_placeholder_images(num_images: int, seed_prompt: str) -> List[str]
             f"Placeholder {i+1}</text>"
             f"</svg>"
         )
-        data_url = "data:image/svg+xml;charset=utf-8," + urllib.parse.quote(svg)
+        data_url = "data:image/svg+xml;base64," + base64.b64encode(svg.encode()).decode()
         demo_images.append(data_url)
 
-    return demo_images
+    return tuple(demo_images)
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Sessions, the LLM cache and the HF blacklist live in process memory unless
+    # Redis is configured, so only default to several workers when it is.
+    workers = int(os.getenv("WEB_CONCURRENCY", 4 if _redis is not None else 1))
+    if workers > 1 and _redis is None:
+        logging.warning("Running %d workers without REDIS_URL: sessions are not shared between workers", workers)
+    # uvloop doesn't support Windows, so fall back to the default asyncio loop there.
+    uvicorn.run(
+        # Worker processes need an import string; a single worker reuses this module
+        # instead of importing it a second time as "main"
+        app if workers == 1 else "main:app",
+        host="0.0.0.0",
+        port=int(os.getenv("PORT", 8000)),
+        workers=workers,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        log_level="info",
+    )